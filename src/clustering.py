@@ -0,0 +1,160 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from enum import Enum
+from math import log2
+from sklearn.cluster import KMeans, DBSCAN, OPTICS
+from sklearn.mixture import GaussianMixture
+from src.colfig import get_config
+from src.fcce import FCCE
+from src.utils import color_str_to_list
+
+CONFIG = get_config('../config/clustering.yaml')
+PALETTE = [color_str_to_list(color) for color in CONFIG['palette']]
+
+
+class ExecutionMode(Enum):
+    INLINE = 0
+    WORKER = 1
+
+
+class ClusteringBackend(ABC):
+    name = None
+    title = None
+    execution_mode = ExecutionMode.INLINE
+    # temporal backends carry state from one scan to the next
+    temporal = False
+
+    def __init__(self, seed=None, **params):
+        self.seed = seed
+        self.params = params
+
+    @abstractmethod
+    def fit_predict(self, X: np.ndarray, origin: np.ndarray) -> np.ndarray:
+        raise NotImplemented
+
+    def estimate_cost(self, n) -> float:
+        # relative work for n points, the Clusterizer turns it into seconds from measured runs
+        return float(n)
+
+    def get_contours(self) -> list:
+        return []
+
+    def get_budget(self):
+        # seconds per fit the backend holds itself to, None when it has no budget
+        return None
+
+
+BACKENDS = {}
+
+
+def register_backend(name, title):
+    def decorator(cls):
+        cls.name = name
+        cls.title = title
+        BACKENDS[name] = cls
+        return cls
+
+    return decorator
+
+
+def create_backend(name, **overrides):
+    params = {**(CONFIG['backends'].get(name) or {}), **overrides}
+    execution_mode = params.pop('execution_mode', None)
+    backend = BACKENDS[name](**params)
+    if execution_mode is not None:
+        backend.execution_mode = ExecutionMode[execution_mode.upper()]
+    return backend
+
+
+def relabel_by_appearance(labels):
+    # keeps colours stable between runs of estimators with arbitrary label order
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    rank = np.empty_like(first)
+    rank[np.argsort(first)] = np.arange(len(first))
+    return rank[inverse.ravel()]
+
+
+@register_backend('k_means', 'K-Means')
+class KMeansBackend(ClusteringBackend):
+
+    def __init__(self, seed=None, **params):
+        super().__init__(seed, **params)
+        self.estimator = KMeans(random_state=seed, **params)
+
+    def fit_predict(self, X, origin):
+        return relabel_by_appearance(self.estimator.fit(X).labels_)
+
+    def estimate_cost(self, n):
+        return float(n * self.estimator.n_clusters)
+
+
+@register_backend('dbscan', 'DBSCAN')
+class DBSCANBackend(ClusteringBackend):
+
+    def __init__(self, seed=None, **params):
+        super().__init__(seed, **params)
+        self.estimator = DBSCAN(**params)
+
+    def fit_predict(self, X, origin):
+        return self.estimator.fit(X).labels_
+
+    def estimate_cost(self, n):
+        return n * log2(n + 1)
+
+
+@register_backend('optics', 'OPTICS')
+class OPTICSBackend(ClusteringBackend):
+
+    def __init__(self, seed=None, **params):
+        super().__init__(seed, **params)
+        self.estimator = OPTICS(**params)
+
+    def fit_predict(self, X, origin):
+        return self.estimator.fit(X).labels_
+
+    def estimate_cost(self, n):
+        return float(n * n)
+
+
+@register_backend('gaussian_mixture', 'Gaussian mixture')
+class GaussianMixtureBackend(ClusteringBackend):
+
+    def __init__(self, seed=None, **params):
+        super().__init__(seed, **params)
+        self.estimator = GaussianMixture(random_state=seed, **params)
+
+    def fit_predict(self, X, origin):
+        return relabel_by_appearance(self.estimator.fit_predict(X))
+
+    def estimate_cost(self, n):
+        return float(n * self.estimator.n_components)
+
+
+@register_backend('fcce', 'FCCE')
+class FCCEBackend(ClusteringBackend):
+    temporal = True
+
+    def __init__(self, seed=None, **params):
+        super().__init__(seed, **params)
+        self.fcce = FCCE(seed=seed, **params)
+        self.origin = None
+        self.contours = []
+
+    def fit_predict(self, X, origin):
+        # history is kept relative to the robot, so it is shifted by the odometry delta
+        s = (0, 0) if self.origin is None else origin - self.origin
+        self.origin = origin
+        contours = self.fcce.push_points(self.fcce.to_polar(X - origin), s)
+        self.contours = [None if contour is None else contour + origin for contour in contours]
+        return self.fcce.labels[-len(X):]
+
+    def estimate_cost(self, n):
+        # the retained history is clustered together with the new scan
+        m = n + self.fcce.gamma * len(self.fcce.points)
+        return float(m * m)
+
+    def get_contours(self):
+        return self.contours
+
+    def get_budget(self):
+        return self.fcce.budget
@@ -1,3 +1,4 @@
+import numpy as np
 import src.geometry as gm
 from pygame import Surface
 from typing import Tuple
@@ -33,7 +34,9 @@ class Controller:
         self.robot = robot
         self.surface = surface
         self.action = Action.NONE
-        self.lidar_points = []
+        self.lidar_points = np.empty((0, 2))
+        self.lidar_segments = np.empty(0, dtype=int)
+        self.lidar_distances = np.empty(0)
         self.menu_state = MenuState()
 
 
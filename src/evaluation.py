@@ -0,0 +1,35 @@
+import numpy as np
+from time import perf_counter
+from sklearn.metrics import adjusted_rand_score, adjusted_mutual_info_score, homogeneity_completeness_v_measure
+from src.clustering import ClusteringBackend
+
+METRICS = ('runtime', 'ari', 'ami', 'homogeneity', 'completeness', 'v_measure', 'noise')
+
+
+def score_labels(truth, predicted):
+    homogeneity, completeness, v_measure = homogeneity_completeness_v_measure(truth, predicted)
+    return {
+        'ari': adjusted_rand_score(truth, predicted),
+        'ami': adjusted_mutual_info_score(truth, predicted),
+        'homogeneity': homogeneity,
+        'completeness': completeness,
+        'v_measure': v_measure,
+        'noise': float(np.mean(np.asarray(predicted) < 0))
+    }
+
+
+def evaluate_scan(backend: ClusteringBackend, points, truth, origin):
+    start = perf_counter()
+    predicted = backend.fit_predict(points, origin)
+    runtime = perf_counter() - start
+    return {'runtime': runtime, **score_labels(truth, predicted)}
+
+
+def summarize(scores):
+    summary = {}
+    for metric in METRICS:
+        values = [score[metric] for score in scores]
+        summary[f'{metric}_mean'] = np.mean(values) if values else np.nan
+        summary[f'{metric}_min'] = np.min(values) if values else np.nan
+        summary[f'{metric}_max'] = np.max(values) if values else np.nan
+    return summary
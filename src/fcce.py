@@ -1,145 +1,99 @@
-from math import atan2, sqrt, cos, sin, acos
-from collections import defaultdict
-import random
+import numpy as np
+from math import sqrt, pi
+from time import perf_counter
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 # import matplotlib.pyplot as plt
 
 
-class Graph:
-    def __init__(self):
-        self.adj = defaultdict(lambda: [])
-
-    def dfs_util(self, temp, v, visited):
-        visited[v] = True
-        temp.append(v)
-        for i in self.adj[v]:
-            if not visited[i]:
-                temp = self.dfs_util(temp, i, visited)
-        return temp
-
-    def add_edge(self, v, w):
-        self.adj[v].append(w)
-        self.adj[w].append(v)
-
-    def connected_components(self):
-        visited = defaultdict(lambda: False)
-        cc = []
-        for v in self.adj.keys():
-            if not visited[v]:
-                temp = []
-                cc.append(self.dfs_util(temp, v, visited))
-        return cc
-
-
-if __name__ == "__main__":
-    g = Graph()
-    g.add_edge((1, 1), (0, 0))
-    g.add_edge((2, 2), (3, 3))
-    g.add_edge((3, 3), (4, 4))
-    # g.add_edge(1, 0)
-    # g.add_edge(2, 3)
-    # g.add_edge(3, 4)
-    cc = g.connected_components()
-    print("Following are connected components")
-    print(cc)
-
-
 class FCCE:
 
-    def __init__(self, gamma, rho, xi, alpha):
+    def __init__(self, gamma, rho, xi, alpha, budget=None, seed=None, max_history=1024):
         self.alpha = alpha
         self.xi = xi
         self.rho = rho
         self.gamma = gamma
-        self.points = []
-
-    def push_points(self, points, s=None):
-        new_points = []
-        for point in self.points:
-            if random.random() < self.gamma:
-                p = self.to_default(point)
-                p = (p[0] - s[0], p[1] - s[1])
-                new_points.append(self.to_polar(p))
-        self.points = new_points + points
-        print(len(self.points))
-
-        mean = 0
-        std = 0
-        for p in self.points:
-            mean += p[1]
-        mean /= len(self.points)
-        for p in self.points:
-            std += pow(p[1]-mean, 2)
-        std = sqrt(std/len(self.points))
-        normalized_points = []
-        for i, p in enumerate(self.points):
-            normalized_points.append((p[0], (p[1]-mean)/std, i))
-
-        graph = Graph()
-        for p1 in normalized_points:
-            for p2 in normalized_points:
-                if self.dist(p1, p2) < self.xi:
-                    graph.add_edge(p1, p2)
-        cc = graph.connected_components()
-
-        res = []
-
-        for c in cc:
-            res.append(self.find_contours(c))
-            # a1, a2 = [], []
-            # for t in c:
-            #     a1.append(self.to_default(self.points[t[2]])[0])
-            #     a2.append(self.to_default(self.points[t[2]])[1])
-            # plt.scatter(a1, a2)
-
-        # plt.show()
-
+        self.budget = budget
+        self.max_history = max_history
+        self.history_limit = None
+        self.elapsed = 0.
+        self.rng = np.random.default_rng(seed)
+        self.points = np.empty((0, 2))
+        self.labels = np.empty(0, dtype=int)
+
+    def push_points(self, points, s=(0, 0)):
+        start = perf_counter()
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        history = self.points[self.rng.random(len(self.points)) < self.gamma]
+        limit = self.max_history if self.history_limit is None else min(self.history_limit, self.max_history)
+        if len(history) > limit:
+            history = history[self.rng.choice(len(history), limit, replace=False)]
+        history = self.to_polar(self.to_default(history) - np.asarray(s, dtype=float))
+        self.points = np.concatenate([history, points])
+
+        if not len(self.points):
+            self.labels = np.empty(0, dtype=int)
+            return []
+
+        std = self.points[:, 1].std() or 1.
+        normalized = np.column_stack([self.points[:, 0], (self.points[:, 1] - self.points[:, 1].mean()) / std])
+        n_components, self.labels = connected_components(self.neighbours(normalized), directed=False)
+
+        res = [self.find_contours(self.points[self.labels == label]) for label in range(n_components)]
+
+        self.elapsed = perf_counter() - start
+        if self.budget is not None:
+            self.adapt_history(len(points))
         return res
 
+    def neighbours(self, normalized, block_size=256):
+        # row blocks keep the distance temporaries at block_size * n instead of n * n
+        rows, cols = [], []
+        for start in range(0, len(normalized), block_size):
+            block = self.dist(normalized[start:start + block_size, None], normalized[None, :]) < self.xi
+            block_rows, block_cols = np.nonzero(block)
+            rows.append(block_rows + start)
+            cols.append(block_cols)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        return csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(len(normalized), len(normalized)))
+
+    def adapt_history(self, scan_size):
+        # clustering is quadratic in the number of points, so the point count scales with sqrt of time
+        scale = min(sqrt(self.budget / max(self.elapsed, 10 ** -6)), 2.)
+        self.history_limit = max(int(len(self.points) * scale) - scan_size, 0)
+
     def find_contours(self, cluster):
 
         if len(cluster) < self.alpha+1:
             return
 
-        cluster = [self.points[c[2]] for c in cluster]
-        cluster = sorted(cluster, key=lambda x: x[0])
-
-        p_min = []
-        p_max = []
-
-        for i in range(0, len(cluster)-self.alpha):
-            t = cluster[i:i+self.alpha]
-            min_ = min([tt[1] for tt in t])
-            max_ = max([tt[1] for tt in t])
-            mean_ = sum([tt[0] for tt in t])/self.alpha
-            p_min.append(self.to_default((mean_, min_)))
-            p_max.append(self.to_default((mean_, max_)))
+        cluster = cluster[np.argsort(cluster[:, 0])]
+        windows = sliding_window_view(cluster, self.alpha, axis=0)[:-1]
+        mean_ = windows[:, 0].mean(axis=1)
+        p_min = self.to_default(np.column_stack([mean_, windows[:, 1].min(axis=1)]))
+        p_max = self.to_default(np.column_stack([mean_, windows[:, 1].max(axis=1)]))
 
-        res = []
-
-        for i in range(1, len(p_min)):
-            res.append((p_min[i], p_min[i-1]))
-            res.append((p_max[i], p_max[i-1]))
-
-        res.append((p_max[0], p_min[0]))
-        res.append((p_max[-1], p_min[-1]))
-        return res
-
-        # for s in res:
-        #     plt.plot([s[0][0], s[1][0]], [s[0][1], s[1][1]], 'b')
+        return np.concatenate([
+            np.stack([p_min[1:], p_min[:-1]], axis=1),
+            np.stack([p_max[1:], p_max[:-1]], axis=1),
+            np.stack([p_max[[0, -1]], p_min[[0, -1]]], axis=1)
+        ])
 
     def dist(self, p1, p2):
-        return sqrt(self.rho*acos(cos(p1[0]-p2[0]))**2 + (1-self.rho)*(p1[1]-p2[1])**2)
+        angle = np.abs((p1[..., 0] - p2[..., 0] + pi) % (2 * pi) - pi)
+        return np.sqrt(self.rho*angle**2 + (1-self.rho)*(p1[..., 1]-p2[..., 1])**2)
 
     @staticmethod
     def to_polar(p):
-        return atan2(p[1], p[0]), sqrt(pow(p[1], 2) + pow(p[0], 2))
+        p = np.asarray(p, dtype=float)
+        return np.stack([np.arctan2(p[..., 1], p[..., 0]), np.hypot(p[..., 0], p[..., 1])], axis=-1)
 
     @staticmethod
     def to_default(p):
-        return p[1] * cos(p[0]), p[1] * sin(p[0])
-
-
+        p = np.asarray(p, dtype=float)
+        return np.stack([p[..., 1] * np.cos(p[..., 0]), p[..., 1] * np.sin(p[..., 0])], axis=-1)
 
 
 if __name__ == '__main__':
@@ -30,9 +30,6 @@ class Point(ICopy):
     def __mul__(self, other):
         return Point(*(self.__values * other))
 
-    def __del__(self):
-        del self.__values
-
     def distance_to(self, point):
         return np.linalg.norm(point.__values - self.__values)
 
@@ -168,6 +165,10 @@ class Polygon:
                 intersects_num += 1
         return bool(intersects_num % 2)
 
+    def to_array(self):
+        return np.array([[segment.a.values, segment.b.values] for segment in self.segments],
+                        dtype=float).reshape(-1, 2, 2)
+
 
 class Ray:
 
@@ -200,6 +201,27 @@ class Ray:
                    key=lambda pd: pd[1])[0]
 
 
+def cast_rays(origin, angles, segments):
+    distances = np.full(len(angles), np.inf)
+    indices = np.full(len(angles), -1)
+    if not len(segments) or not len(angles):
+        return distances, indices
+    directions = np.column_stack([np.cos(angles), np.sin(angles)])
+    edges = segments[:, 1] - segments[:, 0]
+    offsets = segments[:, 0] - origin
+    # origin + t * direction == segment.a + u * edge, solved for every (ray, segment) pair
+    denom = directions[:, None, 0] * edges[None, :, 1] - directions[:, None, 1] * edges[None, :, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (offsets[:, 0] * edges[:, 1] - offsets[:, 1] * edges[:, 0])[None, :] / denom
+        u = (offsets[None, :, 0] * directions[:, None, 1] - offsets[None, :, 1] * directions[:, None, 0]) / denom
+    hit = (np.abs(denom) > EPS) & (t > 0) & (u >= -EPS) & (u <= 1 + EPS)
+    t = np.where(hit, t, np.inf)
+    nearest = np.argmin(t, axis=1)
+    distances = t[np.arange(len(angles)), nearest]
+    indices = np.where(np.isfinite(distances), nearest, -1)
+    return distances, indices
+
+
 if __name__ == '__main__':
     a, b = Point(1, 2), Point(2, 1)
     seg = Segment(a, b)
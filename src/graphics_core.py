@@ -1,3 +1,4 @@
+import numpy as np
 import pygame
 
 from src.colfig import get_config
@@ -12,11 +13,21 @@ for key in COLORS:
 
 
 def draw_point(screen, color, point: Point, radius=3, *args, **kwargs):
-    pygame.draw.circle(screen, color, point.values, radius, *args, **kwargs)
+    pygame.draw.circle(screen, color, point.values.tolist(), radius, *args, **kwargs)
+
+
+def draw_points(screen, color, points, radius=3, *args, **kwargs):
+    for point in np.asarray(points).tolist():
+        pygame.draw.circle(screen, color, point, radius, *args, **kwargs)
 
 
 def draw_segment(screen, color, segment: Segment, *args, **kwargs):
-    pygame.draw.line(screen, color, segment.a.values, segment.b.values, *args, **kwargs)
+    pygame.draw.line(screen, color, segment.a.values.tolist(), segment.b.values.tolist(), *args, **kwargs)
+
+
+def draw_segments(screen, color, segments, *args, **kwargs):
+    for a, b in np.asarray(segments).tolist():
+        pygame.draw.line(screen, color, a, b, *args, **kwargs)
 
 
 class UIComponent(ABC):
@@ -59,3 +70,15 @@ class Button(UIComponent):
         self.on_click = on_click
         self.last_pressed = False
         self.__active = active
+
+
+class Label(UIComponent):
+
+    def process(self, surface: pygame.Surface):
+        surface.blit(self.f1.render(self.text, True, 3 * [0]), (self.x, self.y))
+
+    def __init__(self, x, y, text=""):
+        self.f1 = pygame.font.Font('../fonts/Dosis-Medium.ttf', 14)
+        self.text = text
+        self.y = y
+        self.x = x
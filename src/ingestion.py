@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import struct
+import numpy as np
+from src.colfig import get_config
+from src.sensor import SensorModel
+from src.simulation import simulate_scans
+
+HEADER = struct.Struct('<4sIIdd')
+MAGIC = b'LIDR'
+POINT_DTYPE = np.dtype('<f4')
+POINT_SIZE = 2 * POINT_DTYPE.itemsize
+# far above any real scan, it bounds what a corrupt header can make the reader buffer
+MAX_POINTS = 2 ** 16
+
+
+class Scan:
+
+    def __init__(self, frame, origin, points):
+        self.frame = frame
+        self.origin = origin
+        self.points = points
+
+
+def encode_scan(frame, origin, points):
+    points = np.ascontiguousarray(points, dtype=POINT_DTYPE).reshape(-1, 2)
+    return HEADER.pack(MAGIC, frame & 0xFFFFFFFF, len(points), *origin) + points.tobytes()
+
+
+def decode_header(header):
+    magic, frame, count, x, y = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"bad scan packet magic {magic!r}")
+    if count > MAX_POINTS:
+        raise ValueError(f"scan packet has {count} points, at most {MAX_POINTS} are accepted")
+    return frame, count, np.array([x, y])
+
+
+def decode_points(payload, count):
+    if len(payload) != count * POINT_SIZE:
+        raise ValueError(f"scan packet payload has {len(payload)} bytes, expected {count * POINT_SIZE}")
+    # a view on the received buffer, nothing is copied
+    return np.frombuffer(payload, dtype=POINT_DTYPE).reshape(-1, 2)
+
+
+class LatestQueue:
+
+    def __init__(self, maxsize=1):
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.malformed = 0
+
+    def put(self, scan: Scan):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(scan)
+
+    def get_latest(self):
+        scan = None
+        while not self.queue.empty():
+            if scan is not None:
+                self.dropped += 1
+            scan = self.queue.get_nowait()
+        return scan
+
+
+class ScanDatagramProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, queue: LatestQueue):
+        self.queue = queue
+
+    def datagram_received(self, data, addr):
+        view = memoryview(data)
+        try:
+            frame, count, origin = decode_header(view[:HEADER.size])
+            self.queue.put(Scan(frame, origin, decode_points(view[HEADER.size:], count)))
+        except (ValueError, struct.error):
+            self.queue.malformed += 1
+
+
+async def receive_stream(queue: LatestQueue, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            frame, count, origin = decode_header(await reader.readexactly(HEADER.size))
+            queue.put(Scan(frame, origin, decode_points(await reader.readexactly(count * POINT_SIZE), count)))
+    except ValueError:
+        # a stream cannot be resynchronized after a bad header
+        queue.malformed += 1
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_ingestion(queue: LatestQueue, host, port, protocol='udp'):
+    loop = asyncio.get_running_loop()
+    if protocol == 'udp':
+        transport, _ = await loop.create_datagram_endpoint(lambda: ScanDatagramProtocol(queue),
+                                                           local_addr=(host, port))
+        return transport
+    if protocol == 'tcp':
+        return await asyncio.start_server(lambda reader, writer: receive_stream(queue, reader, writer), host, port)
+    raise ValueError(f"unknown protocol {protocol}")
+
+
+def parse_address(address):
+    protocol, host, port = address.split(':')
+    return protocol, host, int(port)
+
+
+async def send_scans(host, port, protocol='udp', rate=10., scans_num=200, seed=None):
+    scan_set = simulate_scans(scans_num, SensorModel(**get_config('../config/lidar.yaml')), seed=seed)
+    loop = asyncio.get_running_loop()
+    transport, writer = None, None
+    if protocol == 'udp':
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+    frame = 0
+    while True:
+        points, _, origin = scan_set.scan(frame % len(scan_set))
+        packet = encode_scan(frame, origin, points)
+        if transport is not None:
+            transport.sendto(packet)
+        else:
+            writer.write(packet)
+            await writer.drain()
+        frame += 1
+        await asyncio.sleep(1 / rate)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stand-in lidar that streams simulated scans.')
+    parser.add_argument('address', help='protocol:host:port, e.g. udp:127.0.0.1:9000')
+    parser.add_argument('--rate', type=float, default=10., help='scans per second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    protocol, host, port = parse_address(args.address)
+    asyncio.run(send_scans(host, port, protocol, args.rate, seed=args.seed))
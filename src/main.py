@@ -1,6 +1,11 @@
+import argparse
+import asyncio
 import pygame
 import src.controller as W
 import src.plugins as P
+from src.colfig import get_config
+from src.ingestion import LatestQueue, parse_address, start_ingestion
+from src.sensor import SensorModel
 pygame.font.init()
 
 pygame.init()
@@ -8,32 +13,47 @@ pygame.init()
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 
+parser = argparse.ArgumentParser()
+parser.add_argument('--listen', help='receive scans from protocol:host:port instead of simulating them')
+args = parser.parse_args()
+
 size = (1280, 720)
 screen = pygame.display.set_mode(size)
 
 pygame.display.set_caption("Lidar clusterize")
 
-clock = pygame.time.Clock()
-
 world = W.Controller(W.Room(), W.Robot(500, 250), screen)
+queue = LatestQueue() if args.listen else None
 processor = W.Processor(world, (
     P.RobotDrawer(),
     P.RobotMover(),
     P.MapBuilder(),
     P.MapDrawer(),
-    P.LidarSimulator(rays_num=180, std=3),
+    P.ScanReceiver(queue) if args.listen else
+    P.LidarSimulator(rays_num=180, sensor=SensorModel(**get_config('../config/lidar.yaml')), scan_budget=0.005),
     P.LidarDataDrawer(radius=3),
-    P.Menu(x=10, y=10, w=110, h=200, menu_state=world.menu_state),
+    P.Menu(x=10, y=10, w=110, menu_state=world.menu_state),
     P.Clusterizer()
 ))
 
-done = False
-while not done:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            done = True
-    screen.fill(WHITE)
-    processor.process()
-    pygame.display.flip()
-    clock.tick(60)
+
+async def run(fps=60):
+    if args.listen:
+        protocol, host, port = parse_address(args.listen)
+        await start_ingestion(queue, host, port, protocol)
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        start = loop.time()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                done = True
+        screen.fill(WHITE)
+        processor.process()
+        pygame.display.flip()
+        # sleeping in the event loop lets the ingestion callbacks run between frames
+        await asyncio.sleep(max(1 / fps - (loop.time() - start), 0))
+
+
+asyncio.run(run())
 pygame.quit()
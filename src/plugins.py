@@ -5,10 +5,14 @@ import numpy as np
 import src.graphics_core as gc
 from src.colfig import get_config
 from src.utils import color_str_to_list
+from src.sensor import SensorModel
 from abc import ABC, abstractmethod
-from src.menu import ClusteringMethod
-from sklearn.cluster import KMeans, DBSCAN, OPTICS
-from sklearn.mixture import GaussianMixture
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from src.clustering import BACKENDS, PALETTE, ExecutionMode, create_backend
+from src.evaluation import score_labels
+
+SCAN_PERIOD = 30
 
 COLORS = get_config('../config/colors.yaml')
 for key in COLORS:
@@ -74,25 +78,23 @@ class RobotMover(PluginBase):
 
     def __init__(self, activate_radius=50):
         self.activate_radius = activate_radius
-        self.last_mouse_position = gm.Point(*pygame.mouse.get_pos())
+        self.last_mouse_position = pygame.mouse.get_pos()
         self.is_holding = False
 
     def process(self, controller: C.Controller):
         if controller.action not in [C.Action.NONE, C.Action.MOVE_ROBOT]:
             return
-        this_mouse_position = gm.Point(*pygame.mouse.get_pos())
-        is_inside = this_mouse_position.distance_to(controller.robot.position) < self.activate_radius
+        this_mouse_position = pygame.mouse.get_pos()
+        is_inside = np.hypot(this_mouse_position[0] - controller.robot.position.x,
+                             this_mouse_position[1] - controller.robot.position.y) < self.activate_radius
         if pygame.mouse.get_pressed(3)[0] and (is_inside or self.is_holding):
             controller.action = C.Action.MOVE_ROBOT
-            delta = this_mouse_position - self.last_mouse_position
-            controller.robot.position.x += delta.x
-            controller.robot.position.y += delta.y
-            del delta
+            controller.robot.position.x += this_mouse_position[0] - self.last_mouse_position[0]
+            controller.robot.position.y += this_mouse_position[1] - self.last_mouse_position[1]
             self.is_holding = True
         else:
             controller.action = C.Action.NONE
             self.is_holding = False
-        del self.last_mouse_position
         self.last_mouse_position = this_mouse_position
 
 
@@ -137,24 +139,48 @@ class MapDrawer(PluginBase):
 
 class LidarSimulator(PluginBase):
 
-    def __init__(self, rays_num=72, std=3):
-        self.std = std
+    def __init__(self, rays_num=72, std=3, sensor=None, seed=None, scan_budget=None, min_rays_num=36):
+        if seed is not None and scan_budget is not None:
+            # the budget changes the ray count with machine load, which breaks reproducible seeded scans
+            raise ValueError("a seeded LidarSimulator must keep a fixed ray count, drop scan_budget")
+        self.sensor = sensor if sensor is not None else SensorModel(std=std)
+        self.rng = np.random.default_rng(seed)
         self.rays_num = rays_num
-        self.iter_seg = gm.Segment(gm.Point(0, 0), gm.Point(0, 0))
+        self.max_rays_num = rays_num
+        self.min_rays_num = min(min_rays_num, rays_num)
+        self.scan_budget = scan_budget
+
+    def adapt_rays_num(self, elapsed):
+        # ray casting is linear in the number of rays
+        scale = min(self.scan_budget / max(elapsed, 10 ** -6), 2.)
+        self.rays_num = int(np.clip(self.rays_num * scale, self.min_rays_num, self.max_rays_num))
+
+    @ProcessReduce(SCAN_PERIOD)
+    def process(self, controller: C.Controller):
+        start = perf_counter()
+        origin = controller.robot.position.values.astype(float)
+        angles = np.linspace(0, 2 * np.pi, self.rays_num + 1)[:-1]
+        points, segments, distances = self.sensor.scan(origin, angles, controller.room.polygon.to_array(), self.rng)
+        controller.lidar_points = points
+        controller.lidar_segments = segments
+        controller.lidar_distances = distances
+        if self.scan_budget is not None:
+            self.adapt_rays_num(perf_counter() - start)
+
+
+class ScanReceiver(PluginBase):
+
+    def __init__(self, queue):
+        self.queue = queue
 
-    @ProcessReduce(30)
     def process(self, controller: C.Controller):
-        self.iter_seg.a = controller.robot.position
-        controller.lidar_points.clear()
-        for alpha in np.linspace(0, 2 * np.pi, self.rays_num + 1)[:-1]:
-            self.iter_seg.b.x = self.iter_seg.a.x + np.cos(alpha)
-            self.iter_seg.b.y = self.iter_seg.a.y + np.sin(alpha)
-            ray = gm.Ray(self.iter_seg)
-            intersect = ray.intersect_with_polygon(controller.room.polygon)
-            if intersect is not None:
-                controller.lidar_points.append(
-                    intersect + (self.iter_seg.b - self.iter_seg.a) * np.random.normal(scale=self.std))
-            del ray
+        scan = self.queue.get_latest()
+        if scan is None:
+            return
+        controller.robot.position.x, controller.robot.position.y = scan.origin
+        controller.lidar_points = scan.points
+        controller.lidar_segments = np.full(len(scan.points), -1)
+        controller.lidar_distances = np.hypot(*(scan.points - scan.origin).T)
 
 
 class LidarDataDrawer(PluginBase):
@@ -163,113 +189,142 @@ class LidarDataDrawer(PluginBase):
         self.radius = radius
 
     def process(self, controller: C.Controller):
-        for point in controller.lidar_points:
-            gc.draw_point(controller.surface, COLORS['color2'], point, radius=self.radius)
+        gc.draw_points(controller.surface, COLORS['color2'], controller.lidar_points, radius=self.radius)
 
 
 class Menu(PluginBase):
 
-    def __init__(self, x, y, w, h, menu_state):
-        self.h = h
+    def __init__(self, x, y, w, menu_state, h=None):
+        self.h = h if h is not None else 40 + 30 * len(BACKENDS)
         self.w = w
         self.y = y
         self.x = x
         self.menu_state = menu_state
-        self.none_button = gc.Button(x + 10, y + 10, x + w - 20, 20, "None",
-                                     on_click=lambda: self.menu_state.set_clustering_method(ClusteringMethod.NONE))
-        self.k_means_button = gc.Button(x + 10, y + 40, x + w - 20, 20, "K-Means",
-                                        on_click=lambda: self.menu_state.set_clustering_method(
-                                            ClusteringMethod.K_MEANS))
-        self.dbscan_button = gc.Button(x + 10, y + 70, x + w - 20, 20, "DBSCAN",
-                                       on_click=lambda: self.menu_state.set_clustering_method(ClusteringMethod.DBSCAN))
-
-        self.optics_button = gc.Button(x + 10, y + 100, x + w - 20, 20, "OPTICS",
-                                       on_click=lambda: self.menu_state.set_clustering_method(ClusteringMethod.OPTICS))
-
-        self.gaussian_mixture_button = gc.Button(x + 10, y + 130, x + w - 20, 20, "Gaussian mixture",
-                                                 on_click=lambda: self.menu_state.set_clustering_method(
-                                                     ClusteringMethod.GAUSSIAN_MIXTURE))
+        self.buttons = {None: gc.Button(x + 10, y + 10, x + w - 20, 20, "None",
+                                        on_click=lambda: self.menu_state.set_clustering_method(None))}
+        for i, (name, backend) in enumerate(BACKENDS.items(), 1):
+            self.buttons[name] = gc.Button(x + 10, y + 10 + 30 * i, x + w - 20, 20, backend.title,
+                                           on_click=lambda name=name: self.menu_state.set_clustering_method(name))
 
     def process(self, controller: C.Controller):
-
-        self.none_button.disable()
-        self.dbscan_button.disable()
-        self.k_means_button.disable()
-        self.optics_button.disable()
-        self.gaussian_mixture_button.disable()
-        if controller.menu_state.clustering_method == ClusteringMethod.NONE:
-            self.none_button.enable()
-        elif controller.menu_state.clustering_method == ClusteringMethod.K_MEANS:
-            self.k_means_button.enable()
-        elif controller.menu_state.clustering_method == ClusteringMethod.DBSCAN:
-            self.dbscan_button.enable()
-        elif controller.menu_state.clustering_method == ClusteringMethod.OPTICS:
-            self.optics_button.enable()
-        elif controller.menu_state.clustering_method == ClusteringMethod.GAUSSIAN_MIXTURE:
-            self.gaussian_mixture_button.enable()
+        for name, button in self.buttons.items():
+            if name == controller.menu_state.clustering_method:
+                button.enable()
+            else:
+                button.disable()
 
         pygame.draw.rect(controller.surface, COLORS['color5'],
                          pygame.Rect((self.x, self.y), (self.x + self.w, self.y + self.h)))
-        self.none_button.process(controller.surface)
-        self.k_means_button.process(controller.surface)
-        self.dbscan_button.process(controller.surface)
-        self.optics_button.process(controller.surface)
-        self.gaussian_mixture_button.process(controller.surface)
+        for button in self.buttons.values():
+            button.process(controller.surface)
 
 
 class Clusterizer(PluginBase):
 
-    def __init__(self):
-        self.k_means = KMeans(n_clusters=6)
-        self.dbscan = DBSCAN(eps=50)
-        self.optics = OPTICS()
-        self.gaussian_mixture = GaussianMixture(n_components=6)
-        self.colors = [
-            [255, 0, 0],
-            [0, 255, 0],
-            [0, 0, 255],
-            [255, 255, 0],
-            [255, 0, 255],
-            [0, 255, 255]
-        ]
-        self.labels = []
-
-    @ProcessReduce(30)
+    def __init__(self, inline_budget=0.005, metrics_position=(10, 695)):
+        self.inline_budget = inline_budget
+        self.backends = {}
+        self.seconds_per_cost = {}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.points = np.empty((0, 2))
+        self.labels = np.empty(0, dtype=int)
+        self.contours = []
+        self.runtime = 0.
+        self.scores = None
+        self.metrics_label = gc.Label(*metrics_position) if metrics_position is not None else None
+
+    def get_backend(self, name):
+        if name not in self.backends:
+            self.backends[name] = create_backend(name)
+        return self.backends[name]
+
+    def clear(self):
+        self.points = np.empty((0, 2))
+        self.labels = np.empty(0, dtype=int)
+        self.contours = []
+        self.scores = None
+
+    def runs_inline(self, backend, n):
+        if backend.execution_mode == ExecutionMode.WORKER:
+            return False
+        # a backend that degrades itself to stay within its own budget never needs offloading
+        if backend.get_budget() is not None:
+            return backend.get_budget() <= self.inline_budget
+        # until a backend has been timed once its cost is unknown, so the first run is inline
+        seconds_per_cost = self.seconds_per_cost.get(backend.name)
+        return seconds_per_cost is None or backend.estimate_cost(n) * seconds_per_cost <= self.inline_budget
+
+    def fit_predict(self, backend, X, origin):
+        start = perf_counter()
+        labels = backend.fit_predict(X, origin)
+        self.runtime = perf_counter() - start
+        return labels
+
+    def score(self, segments):
+        # scans from the ingestion layer carry no wall labels (-1), so they are not scored
+        if len(segments) and len(segments) == len(self.labels) and (segments >= 0).all():
+            self.scores = score_labels(segments, self.labels)
+        else:
+            self.scores = None
+
+    @ProcessReduce(SCAN_PERIOD)
     def clusterize(self, controller: C.Controller):
-        if not len(controller.lidar_points):
+        method = controller.menu_state.clustering_method
+        if method is None or not len(controller.lidar_points):
+            self.clear()
+            return
+        if self.pending is not None and self.pending[0] == method:
+            # backends may keep state (FCCE history), so one instance is never fit twice at once
             return
-        X = np.array(list(map(lambda x: x.values, controller.lidar_points)))
-        if controller.menu_state.clustering_method == ClusteringMethod.K_MEANS:
-            labels = self.k_means.fit(X).labels_
-            label_values = []
-            for t in labels:
-                if t not in label_values:
-                    label_values.append(t)
-            labels_new = np.zeros_like(labels)
-            for i, label_value in enumerate(label_values):
-                labels_new[labels == label_value] = i
-            self.labels = labels_new
-        elif controller.menu_state.clustering_method == ClusteringMethod.DBSCAN:
-            self.labels = self.dbscan.fit(X).labels_
-        elif controller.menu_state.clustering_method == ClusteringMethod.OPTICS:
-            self.labels = self.optics.fit(X).labels_
-        elif controller.menu_state.clustering_method == ClusteringMethod.GAUSSIAN_MIXTURE:
-            labels = self.gaussian_mixture.fit_predict(X)
-            label_values = []
-            for t in labels:
-                if t not in label_values:
-                    label_values.append(t)
-            labels_new = np.zeros_like(labels)
-            for i, label_value in enumerate(label_values):
-                labels_new[labels == label_value] = i
-            self.labels = labels_new
+        backend = self.get_backend(method)
+        X = np.asarray(controller.lidar_points, dtype=float)
+        segments = controller.lidar_segments
+        origin = controller.robot.position.values.copy()
+        if not self.runs_inline(backend, len(X)):
+            if self.pending is None:
+                self.pending = (method, X, segments, self.executor.submit(self.fit_predict, backend, X, origin))
         else:
-            self.labels = []
+            cost = max(backend.estimate_cost(len(X)), 1.)
+            try:
+                labels = self.fit_predict(backend, X, origin)
+            except ValueError:
+                # e.g. an external scan with fewer points than the estimator needs
+                self.clear()
+                return
+            # only inline runs are timed into the cost model, worker runs compete with the render loop for the GIL
+            self.seconds_per_cost[backend.name] = self.runtime / cost
+            self.points = X
+            self.labels = labels
+            self.contours = backend.get_contours()
+            self.score(segments)
+
+    def collect(self, controller: C.Controller):
+        if self.pending is None or not self.pending[3].done():
+            return
+        method, points, segments, future = self.pending
+        self.pending = None
+        if method != controller.menu_state.clustering_method:
+            return
+        try:
+            labels = future.result()
+        except ValueError:
+            self.clear()
+            return
+        self.points = points
+        self.labels = labels
+        self.contours = self.get_backend(method).get_contours()
+        self.score(segments)
 
     def process(self, controller: C.Controller):
+        self.collect(controller)
         self.clusterize(controller)
-        if not len(controller.lidar_points):
-            return
-        for i in range(len(self.labels)):
-            gc.draw_point(controller.surface, self.colors[self.labels[i] % len(self.colors)],
-                          controller.lidar_points[i])
+        for label in np.unique(self.labels):
+            gc.draw_points(controller.surface, PALETTE[label % len(PALETTE)], self.points[self.labels == label])
+        for label, contour in enumerate(self.contours):
+            if contour is not None:
+                gc.draw_segments(controller.surface, PALETTE[label % len(PALETTE)], contour, width=2)
+        if self.metrics_label is not None and self.scores is not None:
+            self.metrics_label.text = f"ARI {self.scores['ari']:.2f}  AMI {self.scores['ami']:.2f}  " \
+                                      f"V {self.scores['v_measure']:.2f}  {self.runtime * 1000:.1f} ms"
+            self.metrics_label.process(controller.surface)
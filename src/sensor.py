@@ -0,0 +1,29 @@
+import numpy as np
+import src.geometry as gm
+
+
+class SensorModel:
+
+    def __init__(self, std=3, range_std=0., min_range=0., max_range=np.inf, dropout=0., angular_jitter=0.,
+                 beam_divergence=0.):
+        self.std = std
+        self.range_std = range_std
+        self.min_range = min_range
+        self.max_range = max_range
+        self.dropout = dropout
+        self.angular_jitter = angular_jitter
+        self.beam_divergence = beam_divergence
+
+    def scan(self, origin, angles, segments, rng: np.random.Generator):
+        n = len(angles)
+        # every ray draws the same amount of randomness, so a seeded scan does not depend on the room
+        jitter = rng.normal(scale=self.angular_jitter, size=n)
+        spread = rng.uniform(-0.5, 0.5, size=n) * self.beam_divergence
+        dropped = rng.random(n) < self.dropout
+        noise = rng.normal(size=n)
+
+        distances, indices = gm.cast_rays(origin, angles + jitter + spread, segments)
+        keep = (indices >= 0) & (distances >= self.min_range) & (distances <= self.max_range) & ~dropped
+        measured = distances[keep] + noise[keep] * (self.std + self.range_std * distances[keep])
+        directions = np.column_stack([np.cos(angles[keep]), np.sin(angles[keep])])
+        return origin + directions * measured[:, None], indices[keep], distances[keep]
@@ -0,0 +1,96 @@
+import numpy as np
+from src.sensor import SensorModel
+
+
+class ScanSet:
+
+    def __init__(self, points, labels, origins, offsets, sequences=None):
+        self.points = points
+        self.labels = labels
+        self.origins = origins
+        self.offsets = offsets
+        # scans with the same sequence id are consecutive scans of one robot walk
+        self.sequences = sequences if sequences is not None else np.zeros(len(origins), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.origins)
+
+    def scan(self, i):
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.points[start:stop], self.labels[start:stop], self.origins[i]
+
+    def arrays(self):
+        return {'points': self.points, 'labels': self.labels, 'origins': self.origins, 'offsets': self.offsets,
+                'sequences': self.sequences}
+
+    def sequence_chunks(self, chunk_size):
+        # chunks never split a walk, so temporal backends see each walk from its first scan
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(self.sequences)) + 1, [len(self)]])
+        start = 0
+        for stop in bounds[1:]:
+            if stop - start >= chunk_size or stop == len(self):
+                yield start, int(stop)
+                start = int(stop)
+
+    def chunks(self, chunk_size):
+        for start in range(0, len(self), chunk_size):
+            yield start, min(start + chunk_size, len(self))
+
+    def save(self, file):
+        np.savez_compressed(file, **self.arrays())
+
+    @staticmethod
+    def load(file):
+        with np.load(file) as data:
+            sequences = data['sequences'] if 'sequences' in data else None
+            return ScanSet(data['points'], data['labels'], data['origins'], data['offsets'], sequences)
+
+    @staticmethod
+    def from_scans(scans):
+        points, labels, origins, sequences = zip(*scans)
+        offsets = np.concatenate([[0], np.cumsum([len(p) for p in points])])
+        return ScanSet(np.concatenate(points).reshape(-1, 2), np.concatenate(labels).astype(np.int64),
+                       np.array(origins, dtype=float).reshape(-1, 2), offsets, np.array(sequences, dtype=np.int64))
+
+
+def box(x, y, w, h):
+    corners = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+    return [(corners[i], corners[(i + 1) % 4]) for i in range(4)]
+
+
+def random_room(rng, size=(1280, 720), obstacles_num=4):
+    w, h = rng.uniform(0.5, 0.9) * size[0], rng.uniform(0.5, 0.9) * size[1]
+    x, y = rng.uniform(0, size[0] - w), rng.uniform(0, size[1] - h)
+    segments = box(x, y, w, h)
+    boxes = []
+    for _ in range(obstacles_num):
+        bw, bh = rng.uniform(20, 0.2 * w), rng.uniform(20, 0.2 * h)
+        bx, by = rng.uniform(x, x + w - bw), rng.uniform(y, y + h - bh)
+        segments += box(bx, by, bw, bh)
+        boxes.append((bx, by, bw, bh))
+    return np.array(segments, dtype=float), (x, y, w, h), boxes
+
+
+def is_free(position, boxes):
+    return not any(bx <= position[0] <= bx + bw and by <= position[1] <= by + bh for bx, by, bw, bh in boxes)
+
+
+def simulate_scans(scans_num, sensor: SensorModel, rays_num=180, scans_per_room=20, step=15, seed=None):
+    # scans come in short robot walks through a room, so temporal methods see consistent odometry
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, rays_num + 1)[:-1]
+    scans = []
+    sequence = 0
+    while len(scans) < scans_num:
+        segments, (x, y, w, h), boxes = random_room(rng)
+        position = np.array([rng.uniform(x, x + w), rng.uniform(y, y + h)])
+        while not is_free(position, boxes):
+            position = np.array([rng.uniform(x, x + w), rng.uniform(y, y + h)])
+        for _ in range(min(scans_per_room, scans_num - len(scans))):
+            points, labels, _ = sensor.scan(position, angles, segments, rng)
+            scans.append((points, labels, position.copy(), sequence))
+            moved = np.clip(position + rng.normal(scale=step, size=2), (x, y), (x + w, y + h))
+            if is_free(moved, boxes):
+                position = moved
+        sequence += 1
+    return ScanSet.from_scans(scans)
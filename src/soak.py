@@ -0,0 +1,124 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import asyncio
+import resource
+import sys
+import tracemalloc
+import numpy as np
+import pygame
+import src.controller as W
+import src.geometry as gm
+import src.plugins as P
+from src.clustering import create_backend
+from src.colfig import get_config
+from src.ingestion import LatestQueue, parse_address, send_scans, start_ingestion
+from src.sensor import SensorModel
+from src.simulation import random_room
+
+
+def current_rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # peak rather than current rss, still flat once the run has warmed up
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build_world(rng, size=(1280, 720)):
+    segments, (x, y, w, h), _ = random_room(rng, size, obstacles_num=0)
+    room = W.Room()
+    for a, b in segments:
+        room.append_segment(gm.Segment(gm.Point(*a), gm.Point(*b)))
+    return W.Controller(room, W.Robot(x + w / 2, y + h / 2), pygame.Surface(size)), (x, y, w, h)
+
+
+async def soak(scans, method, warmup, sample_every, listen=None, seed=0, overrides=None):
+    rng = np.random.default_rng(seed)
+    world, (x, y, w, h) = build_world(rng)
+    world.menu_state.set_clustering_method(method)
+    queue = LatestQueue() if listen else None
+    clusterizer = P.Clusterizer()
+    if overrides:
+        clusterizer.backends[method] = create_backend(method, **overrides)
+    processor = W.Processor(world, (
+        P.RobotDrawer(),
+        P.RobotMover(),
+        P.MapBuilder(),
+        P.MapDrawer(),
+        P.ScanReceiver(queue) if listen else
+        P.LidarSimulator(rays_num=180, sensor=SensorModel(**get_config('../config/lidar.yaml')), seed=seed),
+        P.LidarDataDrawer(radius=3),
+        P.Menu(x=10, y=10, w=110, menu_state=world.menu_state),
+        clusterizer
+    ))
+
+    server, sender = None, None
+    if listen:
+        protocol, host, port = parse_address(listen)
+        server = await start_ingestion(queue, host, port, protocol)
+        sender = asyncio.create_task(send_scans(host, port, protocol, rate=1000., seed=seed))
+
+    samples = []
+    tracemalloc.start()
+    try:
+        # the simulator and the clusterizer run once every SCAN_PERIOD frames
+        for frame in range((warmup + scans) * P.SCAN_PERIOD):
+            world.robot.position.x = np.clip(world.robot.position.x + rng.normal(scale=2), x + 1, x + w - 1)
+            world.robot.position.y = np.clip(world.robot.position.y + rng.normal(scale=2), y + 1, y + h - 1)
+            processor.process()
+            # lets the ingestion callbacks run, like the render loop in main.py
+            await asyncio.sleep(0)
+            scan, phase = divmod(frame, P.SCAN_PERIOD)
+            if not phase and scan >= warmup and (scan - warmup) % sample_every == 0:
+                samples.append((scan - warmup, tracemalloc.get_traced_memory()[0], current_rss()))
+        samples.append((scans, tracemalloc.get_traced_memory()[0], current_rss()))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        if sender is not None:
+            sender.cancel()
+            server.close()
+    return samples, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the headless pipeline and check that memory stays flat.')
+    parser.add_argument('--scans', type=int, default=2000, help='scans clustered after the warmup')
+    parser.add_argument('--warmup', type=int, default=20, help='scans before the baseline is taken')
+    parser.add_argument('--sample-every', type=int, default=500, help='scans')
+    parser.add_argument('--method', default='fcce', help='clustering backend, e.g. optics runs on the worker thread')
+    parser.add_argument('--listen', help='feed scans through the ingestion layer at protocol:host:port instead '
+                                         'of the simulator, a local sender is started')
+    parser.add_argument('--gamma', type=float, help='fcce history retention, close to 1 fills the history up to its cap')
+    parser.add_argument('--no-budget', action='store_true', help='run fcce without its time budget, so only '
+                                                                 'max_history bounds the history')
+    parser.add_argument('--max-traced-growth', type=int, default=256, help='KiB')
+    parser.add_argument('--max-rss-growth', type=int, default=16, help='MiB')
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    overrides = {}
+    if args.gamma is not None:
+        overrides['gamma'] = args.gamma
+    if args.no_budget:
+        overrides['budget'] = None
+    samples, peak = asyncio.run(soak(args.scans, args.method, args.warmup, args.sample_every, args.listen,
+                                     overrides=overrides))
+    for scan, traced, rss in samples:
+        print(f"scan {scan:8d}  traced {traced / 1024:10.1f} KiB  rss {rss / 2 ** 20:8.1f} MiB")
+    traced_growth = (samples[-1][1] - samples[0][1]) / 1024
+    rss_growth = (samples[-1][2] - samples[0][2]) / 2 ** 20
+    print(f"growth: traced {traced_growth:.1f} KiB, rss {rss_growth:.1f} MiB, peak traced {peak / 2 ** 20:.1f} MiB")
+    pygame.quit()
+    if traced_growth > args.max_traced_growth or rss_growth > args.max_rss_growth:
+        print("memory is not flat", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.clustering import BACKENDS, CONFIG
+from src.colfig import get_config
+from src.evaluation import evaluate_scan, summarize
+from src.sensor import SensorModel
+from src.simulation import ScanSet, simulate_scans
+
+
+class SharedScanSet:
+
+    def __init__(self, scan_set: ScanSet):
+        self.blocks = []
+        self.specs = {}
+        for key, array in scan_set.arrays().items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[key] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+
+
+_scans = None
+_blocks = []
+
+
+def attach_scans(specs):
+    global _scans
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+        arrays[key] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    _scans = ScanSet(**arrays)
+
+
+def sequence_seed(seed, sequence):
+    return int(np.random.SeedSequence([seed, sequence]).generate_state(1)[0])
+
+
+def evaluate(name, params, start, stop, seed):
+    backend = None
+    scores, failures = [], 0
+    for i in range(start, stop):
+        sequence = _scans.sequences[i]
+        if backend is None or sequence != _scans.sequences[i - 1]:
+            # a fresh backend per walk, seeded by the walk, so results do not depend on chunking
+            backend = BACKENDS[name](seed=sequence_seed(seed, sequence), **params)
+        points, labels, origin = _scans.scan(i)
+        if not len(points):
+            continue
+        try:
+            scores.append(evaluate_scan(backend, points, labels, origin))
+        except ValueError:
+            failures += 1
+    return scores, failures
+
+
+def expand_grid(grid):
+    for name, axes in grid.items():
+        params = dict(CONFIG['backends'].get(name) or {})
+        params.pop('execution_mode', None)
+        # a time budget makes results depend on machine load, it is only swept when the grid asks for it
+        params.pop('budget', None)
+        keys = list(axes)
+        for values in itertools.product(*(axes[key] for key in keys)):
+            yield name, {**params, **dict(zip(keys, values))}
+
+
+def run_sweep(grid, scan_set: ScanSet, workers=None, chunk_size=100, seed=0):
+    configs = list(expand_grid(grid))
+    shared = SharedScanSet(scan_set)
+    results = [[[], 0] for _ in configs]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_scans,
+                                 initargs=(shared.specs,)) as executor:
+            futures = []
+            for i, (name, params) in enumerate(configs):
+                # only temporal backends need whole walks, stateless ones spread over every core
+                chunks = scan_set.sequence_chunks(chunk_size) if BACKENDS[name].temporal else scan_set.chunks(chunk_size)
+                for start, stop in chunks:
+                    futures.append((i, executor.submit(evaluate, name, params, start, stop, seed)))
+            for i, future in futures:
+                scores, failures = future.result()
+                results[i][0].extend(scores)
+                results[i][1] += failures
+    finally:
+        shared.close()
+
+    rows = []
+    for (name, params), (scores, failures) in zip(configs, results):
+        rows.append({
+            'backend': name,
+            'params': json.dumps(params, sort_keys=True),
+            'scans': len(scores),
+            'failures': failures,
+            **summarize(scores)
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate a grid of clustering parameters on lidar scans.')
+    parser.add_argument('grid', help='yaml file mapping backend names to lists of parameter values')
+    parser.add_argument('--scans', help='.npz file with recorded scans')
+    parser.add_argument('--simulate', type=int, default=1000, help='number of scans to simulate without --scans')
+    parser.add_argument('--save-scans', help='write the simulated scans to this .npz file')
+    parser.add_argument('--sensor', default='../config/lidar.yaml')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=100)
+    parser.add_argument('--output', help='csv file, stdout by default')
+    args = parser.parse_args(argv)
+
+    if args.scans:
+        scan_set = ScanSet.load(args.scans)
+    else:
+        scan_set = simulate_scans(args.simulate, SensorModel(**get_config(args.sensor)), seed=args.seed)
+        if args.save_scans:
+            scan_set.save(args.save_scans)
+
+    rows = run_sweep(get_config(args.grid), scan_set, args.workers, args.chunk_size, args.seed)
+    stream = open(args.output, 'w', newline='') if args.output else sys.stdout
+    writer = csv.DictWriter(stream, fieldnames=list(rows[0]) if rows else ['backend'])
+    writer.writeheader()
+    writer.writerows(rows)
+    if args.output:
+        stream.close()
+
+
+if __name__ == '__main__':
+    main()